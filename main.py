@@ -1,12 +1,38 @@
 """main.py"""
 
-from itertools import combinations, product
+import dis
+import inspect
+import os
+import pickle
+import random
+from bisect import bisect_right
+from collections import defaultdict, deque
+from contextlib import suppress
+from functools import wraps
+from hashlib import blake2b
+from itertools import (
+    combinations,
+    combinations_with_replacement,
+    compress,
+    permutations,
+    product,
+    starmap,
+)
+from operator import contains, eq, gt, itemgetter, lt, ne
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from types import CodeType, FunctionType, ModuleType
 from typing import (
+    AbstractSet,
     Callable,
     Collection,
+    FrozenSet,
+    Hashable,
     Iterable,
+    Iterator,
     KeysView,
     Literal,
+    Mapping,
     MutableMapping,
     MutableSequence,
     MutableSet,
@@ -22,9 +48,327 @@ from typing import (
 IntDomain = MutableSet[int]
 EncodingDomain = MutableSet[Tuple[int]]
 Domain = Union[IntDomain, EncodingDomain]
+Value = Union[int, Tuple[int, ...]]
+
+VariableChoiceStrategy = Literal[
+    "lexicographic",
+    "random",
+    "domain",
+    "constraint",
+    "dynamic-constraint",
+]
+ValueChoiceStrategy = Literal["random", "support", "less-filtering"]
 
 Variable = str
 
+ComputeValidTuples = Callable[..., AbstractSet[Tuple[int, ...]]]
+
+BitDomain = int
+BitSupports = Mapping[Variable, Sequence[Tuple[Variable, Sequence[BitDomain]]]]
+Kernel = Callable[
+    [int, Mapping[Variable, int], Mapping[Variable, BitDomain]],
+    Optional[MutableMapping[Variable, BitDomain]],
+]
+Frame = Tuple[Variable, Iterator[int], Mapping[Variable, BitDomain]]
+
+COMPARISONS: Mapping[str, Callable[[float, float], bool]] = {"<": lt, "=": eq, ">": gt}
+
+
+def different_pairs(
+    domain_1: AbstractSet[int], domain_2: AbstractSet[int]
+) -> FrozenSet[Tuple[int, int]]:
+    """Return the pairs of different values
+
+    Args:
+        domain_1 (AbstractSet[int]): Domain of the first variable
+        domain_2 (AbstractSet[int]): Domain of the second variable
+
+    Returns:
+        FrozenSet[Tuple[int, int]]: Pairs (v1, v2) such that v1 != v2
+    """
+    return frozenset(product(domain_1, domain_2)) - {
+        (value, value) for value in domain_1 & domain_2
+    }
+
+
+def equal_pairs(
+    domain_1: AbstractSet[int], domain_2: AbstractSet[int]
+) -> FrozenSet[Tuple[int, int]]:
+    """Return the pairs of equal values
+
+    Args:
+        domain_1 (AbstractSet[int]): Domain of the first variable
+        domain_2 (AbstractSet[int]): Domain of the second variable
+
+    Returns:
+        FrozenSet[Tuple[int, int]]: Pairs (v1, v2) such that v1 == v2
+    """
+    return frozenset((value, value) for value in domain_1 & domain_2)
+
+
+def less_pairs(
+    domain_1: AbstractSet[int], domain_2: AbstractSet[int]
+) -> FrozenSet[Tuple[int, int]]:
+    """Return the pairs of increasing values
+
+    Args:
+        domain_1 (AbstractSet[int]): Domain of the first variable
+        domain_2 (AbstractSet[int]): Domain of the second variable
+
+    Returns:
+        FrozenSet[Tuple[int, int]]: Pairs (v1, v2) such that v1 < v2
+    """
+    values_2 = sorted(domain_2)
+    return frozenset(
+        (value_1, value_2)
+        for value_1 in domain_1
+        for value_2 in values_2[bisect_right(values_2, value_1) :]
+    )
+
+
+def greater_pairs(
+    domain_1: AbstractSet[int], domain_2: AbstractSet[int]
+) -> FrozenSet[Tuple[int, int]]:
+    """Return the pairs of decreasing values
+
+    Args:
+        domain_1 (AbstractSet[int]): Domain of the first variable
+        domain_2 (AbstractSet[int]): Domain of the second variable
+
+    Returns:
+        FrozenSet[Tuple[int, int]]: Pairs (v1, v2) such that v1 > v2
+    """
+    return frozenset(
+        (value_1, value_2) for value_2, value_1 in less_pairs(domain_2, domain_1)
+    )
+
+
+# Valid pairs of canonical predicates, built without evaluating the predicate
+CLOSED_FORMS: MutableMapping[
+    Hashable,
+    Callable[[AbstractSet[int], AbstractSet[int]], FrozenSet[Tuple[int, int]]],
+] = {ne: different_pairs, eq: equal_pairs, lt: less_pairs, gt: greater_pairs}
+
+
+def symmetric_valid_tuples(
+    domain: AbstractSet[int], size: int, function: Callable[..., bool]
+) -> MutableSet[Tuple[int, ...]]:
+    """Return the tuples satisfying a function invariant under permutation
+
+    The function is evaluated once per multiset of values and every
+    permutation of a satisfying multiset is valid.
+
+    Args:
+        domain (AbstractSet[int]): Domain shared by the variables
+        size (int): Number of variables
+        function (Callable[..., bool]): Symmetric truth function
+
+    Returns:
+        MutableSet[Tuple[int, ...]]: Tuples satisfying the function
+    """
+    valid_tuples: MutableSet[Tuple[int, ...]] = set()
+    for values in combinations_with_replacement(domain, size):
+        if function(*values):
+            valid_tuples.update(permutations(values))
+    return valid_tuples
+
+
+def default_cache_dir() -> Path:
+    """Return the default directory of the persistent cache
+
+    Returns:
+        Path: ~/.cache/csp
+    """
+    return Path.home() / ".cache" / "csp"
+
+
+def nested_code_objects(code: CodeType) -> Iterator[CodeType]:
+    """Return a code object and the code objects nested in it
+
+    Args:
+        code (CodeType): Code object
+
+    Yields:
+        Iterator[CodeType]: The code object, then the nested code objects
+    """
+    yield code
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            yield from nested_code_objects(const)
+
+
+def dependency_signature(value: object, visited: AbstractSet[Callable]) -> object:
+    """Return what a truth function depends on through a value it refers to
+
+    Args:
+        value (object): Global or closure value used by the function
+        visited (AbstractSet[Callable]): Functions whose signature is being
+            computed
+
+    Raises:
+        TypeError: Modules, classes and functions without signature are not
+            covered by a signature
+
+    Returns:
+        object: Picklable value standing for the dependency
+    """
+    if isinstance(value, FunctionType):
+        if value in visited:
+            return value.__qualname__
+        signature = function_signature(value, visited)
+        if signature is None:
+            raise TypeError("Function " + value.__qualname__ + " has no signature")
+        return signature
+    if isinstance(value, (ModuleType, type)):
+        raise TypeError("Modules and classes are not covered by a signature")
+    return value
+
+
+def function_signature(
+    function: Callable, visited: AbstractSet[Callable] = frozenset()
+) -> Optional[bytes]:
+    """Return a serialization of what the result of a truth function depends on
+
+    The signature covers the source and bytecode of the function, its
+    default values, its closure and the globals it loads. Functions
+    referred to are covered by their own signature, recursively. Bound
+    methods and other callables have no signature, as the state they read
+    through their instance is not covered.
+
+    Args:
+        function (Callable): Truth function
+        visited (AbstractSet[Callable], optional): Functions whose signature
+            is being computed. Defaults to frozenset().
+
+    Returns:
+        Optional[bytes]: Signature of the function, None if it is not a plain
+            function, if it cannot be computed or if the function refers to
+            a module or a class
+    """
+    if not isinstance(function, FunctionType):
+        return None
+    code = function.__code__
+    try:
+        source = inspect.getsource(function)
+    except (OSError, TypeError):
+        return None
+    visited = visited | {function}
+    codes = list(nested_code_objects(code))
+    names = sorted(
+        {
+            instruction.argval
+            for c in codes
+            for instruction in dis.get_instructions(c)
+            if instruction.opname == "LOAD_GLOBAL"
+        }
+    )
+    try:
+        referenced_globals = {
+            name: dependency_signature(function.__globals__[name], visited)
+            for name in names
+            if name in function.__globals__
+        }
+        closure = [
+            dependency_signature(cell.cell_contents, visited)
+            for cell in function.__closure__ or ()
+        ]
+        return pickle.dumps(
+            (
+                source,
+                [
+                    (c.co_code, [k for k in c.co_consts if not isinstance(k, CodeType)])
+                    for c in codes
+                ],
+                function.__defaults__,
+                function.__kwdefaults__,
+                closure,
+                referenced_globals,
+            )
+        )
+    except (pickle.PicklingError, TypeError, AttributeError, ValueError):
+        return None
+
+
+def function_key(function: Callable) -> Optional[Hashable]:
+    """Return a key identifying the results of a truth function
+
+    Canonical predicates of CLOSED_FORMS are their own key. Other functions
+    are keyed by their signature, which covers the values of the globals and
+    of the closure they read.
+
+    Args:
+        function (Callable): Truth function
+
+    Returns:
+        Optional[Hashable]: Key of the function, None if its results cannot
+            be identified
+    """
+    try:
+        if function in CLOSED_FORMS:
+            return function
+    except TypeError:
+        return None
+    return function_signature(function)
+
+
+def persistent(compute: ComputeValidTuples) -> ComputeValidTuples:
+    """Persist on disk the valid tuples computed from a truth function
+
+    The results are stored in the cache directory of the CSP, keyed by the
+    signature of the function and the domains of the variables. Nothing is
+    persisted when the CSP has no cache directory or when the function
+    has no signature.
+
+    Args:
+        compute (ComputeValidTuples): Method computing the valid tuples
+
+    Returns:
+        ComputeValidTuples: Method reading and writing the persisted results
+    """
+
+    @wraps(compute)
+    def wrapper(
+        self: "CSP",
+        domains: Sequence[AbstractSet[int]],
+        function: Callable[..., bool],
+        symmetric: bool = False,
+    ) -> AbstractSet[Tuple[int, ...]]:
+        if self.cache_dir is None:
+            return compute(self, domains, function, symmetric)
+        signature = function_signature(function)
+        if signature is None:
+            return compute(self, domains, function, symmetric)
+        key = pickle.dumps(
+            (
+                compute.__name__,
+                signature,
+                [sorted(domain) for domain in domains],
+                symmetric,
+            )
+        )
+        path = self.cache_dir / (blake2b(key).hexdigest() + ".pickle")
+        try:
+            with open(path, "rb") as file:
+                return pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            pass
+        valid_tuples = compute(self, domains, function, symmetric)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with NamedTemporaryFile("wb", dir=self.cache_dir, delete=False) as file:
+                try:
+                    pickle.dump(valid_tuples, file)
+                    file.close()
+                    os.replace(file.name, path)
+                finally:
+                    with suppress(FileNotFoundError):
+                        os.unlink(file.name)
+        except OSError:
+            pass
+        return valid_tuples
+
+    return wrapper
+
 
 class Constraint:
     """A binary constraint"""
@@ -33,22 +377,79 @@ class Constraint:
         self,
         variable_1: Variable,
         variable_2: Variable,
-        valid_tuples: MutableSet[
-            Tuple[Union[int, Sequence[int]], Union[int, Sequence[int]]]
-        ],
+        valid_tuples: AbstractSet[Tuple[Value, Value]],
     ) -> None:
         self.variables = (variable_1, variable_2)
         self.valid_tuples = valid_tuples
 
+    @property
+    def valid_tuples(self) -> AbstractSet[Tuple[Value, Value]]:
+        """Tuples of values for the variables which satisfy the constraint"""
+        return self.__valid_tuples
+
+    @valid_tuples.setter
+    def valid_tuples(self, valid_tuples: AbstractSet[Tuple[Value, Value]]) -> None:
+        self.__valid_tuples = valid_tuples
+        self.__supports: MutableSequence[
+            Optional[Mapping[Value, AbstractSet[Value]]]
+        ] = [None, None]
+
+    def supports(self, variable: Variable, value: Value) -> AbstractSet[Value]:
+        """Return the values of the other variable compatible with a value
+
+        Args:
+            variable (Variable): One of the variables of the constraint
+            value (Value): Value of this variable
+
+        Returns:
+            AbstractSet[Value]: Values of the other variable supporting the value
+        """
+        i = self.variables.index(variable)
+        supports = self.__supports[i]
+        if supports is None:
+            supports = defaultdict(set)
+            for valid_tuple in self.valid_tuples:
+                supports[valid_tuple[i]].add(valid_tuple[1 - i])
+            self.__supports[i] = supports
+        return supports.get(value, frozenset())
+
+    def other(self, variable: Variable) -> Variable:
+        """Return the other variable used in the constraint
+
+        Args:
+            variable (Variable): One of the variables of the constraint
+
+        Returns:
+            Variable: The other variable of the constraint
+        """
+        variable_1, variable_2 = self.variables
+        return variable_2 if variable == variable_1 else variable_1
+
 
 class CSP:
     """A Constraint Satisfactiony Problem"""
 
-    def __init__(self) -> None:
+    def __init__(self, cache_dir: Optional[Union[str, os.PathLike]] = None) -> None:
+        """Create an empty CSP
+
+        Args:
+            cache_dir (Optional[Union[str, os.PathLike]], optional): Directory
+                where the valid tuples computed from truth functions are
+                persisted across instances, e.g. default_cache_dir().
+                Defaults to None (no persistence).
+        """
+        self.cache_dir = None if cache_dir is None else Path(cache_dir)
         self.primary_variables: MutableSet[Variable] = set()
         self.domains: MutableMapping[Variable, Domain] = {}
         self.constraints: MutableSequence[Constraint] = []
+        self.variable_constraints: MutableMapping[
+            Variable, MutableSequence[Constraint]
+        ] = defaultdict(list)
         self.encoding_variables_count: int = 0
+        self.predicate_cache: MutableMapping[
+            Tuple[Hashable, FrozenSet[int], FrozenSet[int]],
+            FrozenSet[Tuple[int, int]],
+        ] = {}
 
     def variables(self) -> KeysView[Variable]:
         """Return all the variables used in the CSP
@@ -69,29 +470,46 @@ class CSP:
         Returns:
             MutableSequence[Constraint]: Constraints using the variable
         """
-        result = []
-        for constraint in self.constraints:
-            if variable in constraint.variables:
-                result.append(constraint)
-        return result
+        return list(self.variable_constraints.get(variable, ()))
 
-    def variable_with_minimal_domain(self) -> Variable:
+    def variable_with_minimal_domain(
+        self,
+        variables: Optional[Iterable[Variable]] = None,
+        domain_size: Optional[Callable[[Variable], int]] = None,
+    ) -> Variable:
         """Return the variable with the minimal domain
 
+        Args:
+            variables (Optional[Iterable[Variable]], optional): Variables to
+                choose from. Defaults to None (all the variables).
+            domain_size (Optional[Callable[[Variable], int]], optional): Size
+                of the current domain of a variable. Defaults to None (size of
+                its domain in the CSP).
+
         Returns:
             Variable: Variable with the minimal domain
         """
-        return min(self.domains.keys(), key=lambda k: len(self.domains[k]))
+        if variables is None:
+            variables = self.variables()
+        if domain_size is None:
+            return min(variables, key=lambda v: len(self.domains[v]))
+        return min(variables, key=domain_size)
 
-    def variable_most_constrained(self) -> Variable:
+    def variable_most_constrained(
+        self, variables: Optional[Iterable[Variable]] = None
+    ) -> Variable:
         """Return the variable the most constrained
 
+        Args:
+            variables (Optional[Iterable[Variable]], optional): Variables to
+                choose from. Defaults to None (all the variables).
+
         Returns:
             Variable: Variable the most constrained
         """
-        return max(
-            self.variables(), key=lambda v: len(self.constraints_concerning_variable(v))
-        )
+        if variables is None:
+            variables = self.variables()
+        return max(variables, key=lambda v: len(self.variable_constraints.get(v, ())))
 
     def add_variable(self, name: str, domain: Iterable[int]) -> None:
         """Add a variable into the CSP
@@ -101,7 +519,7 @@ class CSP:
             domain (Iterable[int]): Domain of the variable
         """
         self.primary_variables.add(name)
-        self.domains.update({name: set(domain)})
+        self.domains[name] = set(domain)
 
     def add_variables(self, names: Iterable[str], domain: Iterable[int]) -> None:
         """Add variables into the CSP
@@ -113,6 +531,16 @@ class CSP:
         for name in names:
             self.add_variable(name, domain)
 
+    def __add_constraint_object(self, constraint: Constraint) -> None:
+        """Add a constraint and index it by the variables it uses
+
+        Args:
+            constraint (Constraint): Constraint to add
+        """
+        self.constraints.append(constraint)
+        for variable in set(constraint.variables):
+            self.variable_constraints[variable].append(constraint)
+
     def __add_binary_extensional_constraint(
         self,
         variable_1: Variable,
@@ -125,16 +553,67 @@ class CSP:
             variable_1 (str): Name of the first variable
             variable_2 (str): Name of the second variable
             valid_tuples (Iterable[Tuple[int, int]]): Tuples of values
-                for the variables which satisfy the constraint
+                for the variables which satisfy the constraint, a set is
+                used as is without being copied
         """
-        constraint = Constraint(variable_1, variable_2, set(valid_tuples))
-        self.constraints.append(constraint)
+        if not isinstance(valid_tuples, AbstractSet):
+            valid_tuples = set(valid_tuples)
+        constraint = Constraint(variable_1, variable_2, valid_tuples)
+        self.__add_constraint_object(constraint)
+
+    @persistent
+    def __binary_valid_tuples_from_function(
+        self,
+        domains: Sequence[AbstractSet[int]],
+        function: Callable[[int, int], bool],
+        symmetric: bool = False,
+    ) -> FrozenSet[Tuple[int, int]]:
+        """Return the pairs of values satisfying a truth function
+
+        Args:
+            domains (Sequence[AbstractSet[int]]): Domains of the two variables
+            function (Callable[[int, int], bool]): Truth function
+            symmetric (bool, optional): Whether the function is invariant
+                under permutation of its arguments. Defaults to False.
+
+        Returns:
+            FrozenSet[Tuple[int, int]]: Pairs satisfying the function
+        """
+        domain_1, domain_2 = domains
+        if symmetric and domain_1 == domain_2:
+            return frozenset(symmetric_valid_tuples(domain_1, 2, function))
+        tuples = list(product(domain_1, domain_2))
+        return frozenset(compress(tuples, starmap(function, tuples)))
+
+    @persistent
+    def __valid_tuples_from_function(
+        self,
+        domains: Sequence[AbstractSet[int]],
+        function: Callable[[*Tuple[int, ...]], bool],
+        symmetric: bool = False,
+    ) -> AbstractSet[Tuple[int, ...]]:
+        """Return the tuples of values satisfying a truth function
+
+        Args:
+            domains (Sequence[AbstractSet[int]]): Domains of the variables
+            function (Callable[..., bool]): Truth function
+            symmetric (bool, optional): Whether the function is invariant
+                under permutation of its arguments. Defaults to False.
+
+        Returns:
+            AbstractSet[Tuple[int, ...]]: Tuples satisfying the function
+        """
+        if symmetric and all(domain == domains[0] for domain in domains):
+            return symmetric_valid_tuples(domains[0], len(domains), function)
+        tuples = product(*domains)
+        return {tuple for tuple in tuples if function(*tuple)}
 
     def __add_binary_constraint_from_function(
         self,
         variable_1: Variable,
         variable_2: Variable,
         function: Callable[[int, int], bool],
+        symmetric: bool = False,
     ) -> None:
         """Add a binary constraint with a truth function
 
@@ -143,12 +622,23 @@ class CSP:
             variable_2 (Variable): Name of the second variable
             function (Callable[[int, int], bool]): Function which return
                 if the values for the variables satisfy the constraint
+            symmetric (bool, optional): Whether the function is invariant
+                under permutation of its arguments. Defaults to False.
         """
-        tuples = product(
-            cast(IntDomain, self.domains[variable_1]),
-            cast(IntDomain, self.domains[variable_2]),
-        )
-        valid_tuples = {tuple for tuple in tuples if function(*tuple)}
+        domain_1 = frozenset(cast(IntDomain, self.domains[variable_1]))
+        domain_2 = frozenset(cast(IntDomain, self.domains[variable_2]))
+        key = function_key(function)
+        if key is not None and (key, domain_1, domain_2) in self.predicate_cache:
+            valid_tuples = self.predicate_cache[(key, domain_1, domain_2)]
+        else:
+            if key in CLOSED_FORMS:
+                valid_tuples = CLOSED_FORMS[key](domain_1, domain_2)
+            else:
+                valid_tuples = self.__binary_valid_tuples_from_function(
+                    (domain_1, domain_2), function, symmetric
+                )
+            if key is not None:
+                self.predicate_cache[(key, domain_1, domain_2)] = valid_tuples
         self.__add_binary_extensional_constraint(variable_1, variable_2, valid_tuples)
 
     def __add_extensional_constraint(
@@ -163,20 +653,21 @@ class CSP:
         """
         self.encoding_variables_count += 1
         encoding_variable = "X" + str(self.encoding_variables_count)
-        self.domains.update(
-            {encoding_variable: cast(EncodingDomain, set(valid_tuples))}
-        )
+        if not isinstance(valid_tuples, AbstractSet):
+            valid_tuples = set(map(tuple, valid_tuples))
+        encoding_domain = cast(EncodingDomain, valid_tuples)
+        self.domains[encoding_variable] = encoding_domain
+        rows = list(encoding_domain)
         for i, variable in enumerate(variables):
-            valid_pairs: MutableSet = set()
-            for valid_tuple in valid_tuples:
-                valid_pairs.add((valid_tuple[i], valid_tuple))
+            valid_pairs = set(zip(map(itemgetter(i), rows), rows))
             constraint = Constraint(variable, encoding_variable, valid_pairs)
-            self.constraints.append(constraint)
+            self.__add_constraint_object(constraint)
 
     def __add_constraint_from_function(
         self,
         variables: Collection[Variable],
         function: Callable[[*Tuple[int, ...]], bool],
+        symmetric: bool = False,
     ) -> None:
         """Add a constraint with a truth function
 
@@ -184,9 +675,12 @@ class CSP:
             variables (Collection[Variable]): Names of the variables
             function (Callable[..., bool]): Function which return
                 if the values for the variables satisfy the constraint
+            symmetric (bool, optional): Whether the function is invariant
+                under permutation of its arguments. Defaults to False.
         """
-        tuples = product(*[self.domains[v] for v in variables])
-        valid_tuples = {tuple for tuple in tuples if function(*tuple)}
+        valid_tuples = self.__valid_tuples_from_function(
+            [cast(IntDomain, self.domains[v]) for v in variables], function, symmetric
+        )
         self.__add_extensional_constraint(variables, valid_tuples)
 
     @overload
@@ -202,6 +696,7 @@ class CSP:
         self,
         variables: Tuple[Variable, Variable],
         truth_table: Callable[[int, int], bool],
+        symmetric: bool = False,
     ) -> None:
         ...
 
@@ -218,6 +713,7 @@ class CSP:
         self,
         variables: Collection[Variable],
         truth_table: Callable[[*Tuple[int, ...]], bool],
+        symmetric: bool = False,
     ) -> None:
         ...
 
@@ -225,12 +721,16 @@ class CSP:
         self,
         variables: Collection[Variable],
         truth_table: Union[Iterable[Sequence[int]], Callable[[*Tuple[int, ...]], bool]],
+        symmetric: bool = False,
     ) -> None:
         """Add a constraint into the CSP
 
         Args:
             variables (Collection[Variable]): Names of the variables
             truth_table (Union[Iterable[Sequence[int]], Callable[[): _description_
+            symmetric (bool, optional): Whether the truth function is invariant
+                under permutation of its arguments, so that only one ordering
+                of each tuple is evaluated. Defaults to False.
 
         Raises:
             AttributeError: Valid tuples must be a subset of cartesian product of variables domains
@@ -239,55 +739,51 @@ class CSP:
             AttributeError: Variables used in constraint must be first added into the CSP
             AttributeError: Variables must be strings
         """
-        if all((isinstance(x, Variable) for x in variables)):
-            if set(variables) <= self.primary_variables:
-                N = len(variables)
-                if isinstance(truth_table, Iterable):
-                    if all((x == N for x in map(len, truth_table))):
-                        if all(
-                            isinstance(x[0], int) & isinstance(x[1], int)
-                            for x in truth_table
-                        ):
-                            if set(truth_table) <= set(
-                                product(*[self.domains[v] for v in variables])
-                            ):
-                                if N == 2:
-                                    self.__add_binary_extensional_constraint(
-                                        *cast(Tuple[Variable, Variable], variables),
-                                        cast(Iterable[Tuple[int, int]], truth_table)
-                                    )
-                                else:
-                                    self.__add_extensional_constraint(
-                                        cast(Collection[Variable], variables),
-                                        cast(Iterable[Sequence[int]], truth_table),
-                                    )
-                            else:
-                                raise AttributeError(
-                                    "Valid tuples must be a subset of cartesian product of variables domains"
-                                )
-                        else:
-                            raise AttributeError("Valid tuples must contain integers")
-                    else:
-                        raise AttributeError(
-                            "Size of valid tuples must match the number of variables used"
-                        )
-                elif isinstance(truth_table, Callable):
-                    if N == 2:
-                        self.__add_binary_constraint_from_function(
-                            *cast(Tuple[Variable, Variable], variables),
-                            cast(Callable[[int, int], bool], truth_table)
-                        )
-                    else:
-                        self.__add_constraint_from_function(
-                            cast(Collection[Variable], variables),
-                            cast(Callable[[*Tuple[int, ...]], bool], truth_table),
-                        )
-            else:
+        if not all((isinstance(x, Variable) for x in variables)):
+            raise AttributeError("Variables must be strings")
+        if not set(variables) <= self.primary_variables:
+            raise AttributeError(
+                "Variables used in constraint must be first added into the CSP"
+            )
+        N = len(variables)
+        if not isinstance(truth_table, Iterable):
+            if isinstance(truth_table, Callable):
+                if N == 2:
+                    self.__add_binary_constraint_from_function(
+                        *cast(Tuple[Variable, Variable], variables),
+                        cast(Callable[[int, int], bool], truth_table),
+                        symmetric,
+                    )
+                else:
+                    self.__add_constraint_from_function(
+                        cast(Collection[Variable], variables),
+                        cast(Callable[[*Tuple[int, ...]], bool], truth_table),
+                        symmetric,
+                    )
+            return
+        truth_table = list(truth_table)
+        domains = [self.domains[v] for v in variables]
+        for x in truth_table:
+            if len(x) != N:
+                raise AttributeError(
+                    "Size of valid tuples must match the number of variables used"
+                )
+            if not all(type(value) is int for value in x):
+                raise AttributeError("Valid tuples must contain integers")
+            if not all(map(contains, domains, x)):
                 raise AttributeError(
-                    "Variables used in constraint must be first added into the CSP"
+                    "Valid tuples must be a subset of cartesian product of variables domains"
                 )
+        if N == 2:
+            self.__add_binary_extensional_constraint(
+                *cast(Tuple[Variable, Variable], variables),
+                cast(Iterable[Tuple[int, int]], truth_table)
+            )
         else:
-            raise AttributeError("Variables must be strings")
+            self.__add_extensional_constraint(
+                cast(Collection[Variable], variables),
+                cast(Iterable[Sequence[int]], truth_table),
+            )
 
     def diff(self, variables: Iterable[Variable]) -> None:
         """Add a constraint to enforce that variables specified have different values
@@ -300,13 +796,7 @@ class CSP:
         """
         if set(variables) <= self.primary_variables:
             for pair in combinations(variables, 2):
-                valid_tuples = {
-                    (value1, value2)
-                    for value1 in cast(IntDomain, self.domains[pair[0]])
-                    for value2 in cast(IntDomain, self.domains[pair[1]])
-                    if value1 != value2
-                }
-                self.__add_binary_extensional_constraint(*pair, valid_tuples)
+                self.__add_binary_constraint_from_function(*pair, ne)
         else:
             raise AttributeError(
                 "Variables used in constraint must be first added into the CSP"
@@ -340,39 +830,361 @@ class CSP:
         if weights is None:
             weights = [1] * N
         if len(variables) == len(weights):
-            possible_tuples = product(*[self.domains[v] for v in variables])
-            valid_tuples = set()
-            for possible_tuple in possible_tuples:
-                s = sum((weights[i] * possible_tuple[i] for i in range(N)))
-                if operator == "<":
-                    if s < value:
-                        valid_tuples.add(possible_tuple)
-                elif operator == "=":
-                    if s == value:
-                        valid_tuples.add(possible_tuple)
-                else:
-                    if s > value:
-                        valid_tuples.add(possible_tuple)
+            compare = COMPARISONS[operator]
+            weighted_domains = [
+                [(v, weight * v) for v in self.domains[variable]]
+                for variable, weight in zip(variables, weights)
+            ]
+            partial_sums: Sequence[Tuple[Tuple[int, ...], float]] = [((), 0)]
+            for weighted_domain in weighted_domains[:-1]:
+                partial_sums = [
+                    (partial_tuple + (v,), partial_sum + weighted_value)
+                    for partial_tuple, partial_sum in partial_sums
+                    for v, weighted_value in weighted_domain
+                ]
+            if weighted_domains:
+                valid_tuples = {
+                    partial_tuple + (v,)
+                    for partial_tuple, partial_sum in partial_sums
+                    for v, weighted_value in weighted_domains[-1]
+                    if compare(partial_sum + weighted_value, value)
+                }
+            else:
+                valid_tuples = {()} if compare(0, value) else set()
             self.__add_extensional_constraint(variables, valid_tuples)
         else:
             raise AttributeError("Variables and Weights must have the same length")
 
+    def __revise(
+        self, variable: Variable, other: Variable, constraint: Constraint
+    ) -> bool:
+        """Remove the values of a variable without support in a constraint
+
+        Args:
+            variable (Variable): Variable whose domain is pruned
+            other (Variable): Other variable of the constraint
+            constraint (Constraint): Constraint between the two variables
+
+        Returns:
+            bool: True if the domain of the variable was pruned
+        """
+        other_domain = self.domains[other]
+        domain = self.domains[variable]
+        supported = {
+            value
+            for value in domain
+            if not constraint.supports(variable, value).isdisjoint(other_domain)
+        }
+        if len(supported) == len(domain):
+            return False
+        self.domains[variable] = cast(Domain, supported)
+        return True
+
+    def ac3(self) -> bool:
+        """Make every constraint arc consistent by pruning the domains
+
+        Returns:
+            bool: False if a domain became empty, True otherwise
+        """
+        arcs = {
+            (variable, other, constraint)
+            for constraint in self.constraints
+            for variable, other in (constraint.variables, constraint.variables[::-1])
+        }
+        queue = deque(arcs)
+        pruned: MutableSet[Variable] = set()
+        while queue:
+            arc = queue.popleft()
+            arcs.discard(arc)
+            variable, other, constraint = arc
+            if self.__revise(variable, other, constraint):
+                if not self.domains[variable]:
+                    return False
+                pruned.add(variable)
+                for neighbor_constraint in self.variable_constraints[variable]:
+                    neighbor = neighbor_constraint.other(variable)
+                    new_arc = (neighbor, variable, neighbor_constraint)
+                    if neighbor_constraint is not constraint and new_arc not in arcs:
+                        arcs.add(new_arc)
+                        queue.append(new_arc)
+        pruned_constraints = {
+            constraint: None
+            for variable in pruned
+            for constraint in self.variable_constraints[variable]
+        }
+        for constraint in pruned_constraints:
+            domain_1, domain_2 = (self.domains[v] for v in constraint.variables)
+            constraint.valid_tuples = {
+                valid_tuple
+                for valid_tuple in constraint.valid_tuples
+                if valid_tuple[0] in domain_1 and valid_tuple[1] in domain_2
+            }
+        return True
+
+    def __bit_supports(
+        self, values: Mapping[Variable, Sequence[Value]]
+    ) -> BitSupports:
+        """Encode the supports of every constraint as bitsets over value indices
+
+        Args:
+            values (Mapping[Variable, Sequence[Value]]): Values of each
+                variable, the index of a value being its bit in a domain
+
+        Returns:
+            BitSupports: For each variable, the other variable of each of its
+                constraints with, for each value index, the bitset of the
+                supporting value indices of the other variable
+        """
+        indices = {v: {value: i for i, value in enumerate(values[v])} for v in values}
+        supports: MutableMapping[
+            Variable, MutableSequence[Tuple[Variable, Sequence[BitDomain]]]
+        ] = defaultdict(list)
+        for constraint in self.constraints:
+            for variable, other in (constraint.variables, constraint.variables[::-1]):
+                other_indices = indices[other]
+                masks = [
+                    sum(
+                        1 << other_indices[partner]
+                        for partner in constraint.supports(variable, value)
+                        if partner in other_indices
+                    )
+                    for value in values[variable]
+                ]
+                supports[variable].append((other, masks))
+        return supports
+
+    def __choose_variable(
+        self,
+        assignment: Mapping[Variable, int],
+        domains: Mapping[Variable, BitDomain],
+        strategy: VariableChoiceStrategy,
+    ) -> Variable:
+        """Choose the next variable to assign
+
+        Args:
+            assignment (Mapping[Variable, int]): Current partial assignment
+            domains (Mapping[Variable, BitDomain]): Current domains
+            strategy (VariableChoiceStrategy): Strategy used to choose the variable
+
+        Returns:
+            Variable: Next variable to assign
+        """
+        unassigned = [v for v in domains if v not in assignment]
+        if strategy == "random":
+            return random.choice(unassigned)
+        if strategy == "domain":
+            return self.variable_with_minimal_domain(
+                unassigned, lambda v: domains[v].bit_count()
+            )
+        if strategy == "constraint":
+            return self.variable_most_constrained(unassigned)
+        if strategy == "dynamic-constraint":
+            return max(
+                unassigned,
+                key=lambda v: sum(
+                    c.other(v) not in assignment for c in self.variable_constraints[v]
+                ),
+            )
+        return min(unassigned)
+
+    def __order_values(
+        self,
+        variable: Variable,
+        assignment: Mapping[Variable, int],
+        domains: Mapping[Variable, BitDomain],
+        supports: BitSupports,
+        strategy: ValueChoiceStrategy,
+    ) -> Sequence[int]:
+        """Order the values to try for a variable
+
+        Args:
+            variable (Variable): Variable to assign
+            assignment (Mapping[Variable, int]): Current partial assignment
+            domains (Mapping[Variable, BitDomain]): Current domains
+            supports (BitSupports): Supports of the constraints as bitsets
+            strategy (ValueChoiceStrategy): Strategy used to order the values
+
+        Returns:
+            Sequence[int]: Indices of the values in the order to try them
+        """
+        indices = []
+        bits = domains[variable]
+        while bits:
+            lowest = bits & -bits
+            indices.append(lowest.bit_length() - 1)
+            bits ^= lowest
+        neighbors = [
+            (other, masks)
+            for other, masks in supports[variable]
+            if other not in assignment
+        ]
+        if strategy == "support":
+            indices.sort(
+                key=lambda i: sum(masks[i].bit_count() for _, masks in neighbors),
+                reverse=True,
+            )
+        elif strategy == "less-filtering":
+            indices.sort(
+                key=lambda i: sum(
+                    domains[other].bit_count() - (domains[other] & masks[i]).bit_count()
+                    for other, masks in neighbors
+                )
+            )
+        else:
+            random.shuffle(indices)
+        return indices
+
+    def __compile_kernel(self, variable: Variable, supports: BitSupports) -> Kernel:
+        """Generate the forward checking function of a variable
+
+        The supports of all the constraints shared with a same neighbour are
+        combined in a single chain of bitwise ANDs, with the bitsets bound as
+        locals of the generated function.
+
+        Args:
+            variable (Variable): Variable assigned by the function
+            supports (BitSupports): Supports of the constraints as bitsets
+
+        Returns:
+            Kernel: Function filtering the domains of the unassigned
+                neighbours, returning None if a domain became empty
+        """
+        neighbors: MutableMapping[Variable, MutableSequence[Sequence[BitDomain]]] = {}
+        for other, masks in supports[variable]:
+            neighbors.setdefault(other, []).append(masks)
+        namespace: MutableMapping[str, object] = {"variable": variable}
+        lines = [
+            "def kernel(index, assignment, domains):",
+            "    new_domains = dict(domains)",
+            "    new_domains[variable] = 1 << index",
+        ]
+        for i, (other, all_masks) in enumerate(neighbors.items()):
+            namespace["neighbor_" + str(i)] = other
+            filtered = "new_domains[neighbor_" + str(i) + "]"
+            for j, masks in enumerate(all_masks):
+                name = "masks_" + str(i) + "_" + str(j)
+                namespace[name] = masks
+                filtered += " & " + name + "[index]"
+            lines += [
+                "    if neighbor_" + str(i) + " not in assignment:",
+                "        domain = " + filtered,
+                "        if not domain:",
+                "            return None",
+                "        new_domains[neighbor_" + str(i) + "] = domain",
+            ]
+        lines.append("    return new_domains")
+        exec("\n".join(lines), namespace)
+        return cast(Kernel, namespace["kernel"])
+
+    def __frame(
+        self,
+        assignment: Mapping[Variable, int],
+        domains: Mapping[Variable, BitDomain],
+        supports: BitSupports,
+        kernels: MutableMapping[Variable, Kernel],
+        variable_choice_strategy: VariableChoiceStrategy,
+        value_choice_strategy: ValueChoiceStrategy,
+    ) -> Frame:
+        """Choose the next variable to assign and the order of its values
+
+        Args:
+            assignment (Mapping[Variable, int]): Current partial assignment
+            domains (Mapping[Variable, BitDomain]): Current domains
+            supports (BitSupports): Supports of the constraints as bitsets
+            kernels (MutableMapping[Variable, Kernel]): Forward checking
+                functions already generated for the variables
+            variable_choice_strategy (VariableChoiceStrategy): Strategy used to
+                choose the next variable
+            value_choice_strategy (ValueChoiceStrategy): Strategy used to
+                choose the next value
+
+        Returns:
+            Frame: Variable chosen, indices of the values left to try and
+                domains before the assignment of the variable
+        """
+        variable = self.__choose_variable(
+            assignment, domains, variable_choice_strategy
+        )
+        if variable not in kernels:
+            kernels[variable] = self.__compile_kernel(variable, supports)
+        indices = self.__order_values(
+            variable, assignment, domains, supports, value_choice_strategy
+        )
+        return variable, iter(indices), domains
+
+    def __backtrack_fc(
+        self,
+        domains: Mapping[Variable, BitDomain],
+        supports: BitSupports,
+        variable_choice_strategy: VariableChoiceStrategy,
+        value_choice_strategy: ValueChoiceStrategy,
+    ) -> Optional[MutableMapping[Variable, int]]:
+        """Backtrack with forward checking from the initial domains
+
+        The depth-first search is driven by an explicit stack of frames, so
+        its depth is not bounded by the recursion limit.
+
+        Args:
+            domains (Mapping[Variable, BitDomain]): Initial domains
+            supports (BitSupports): Supports of the constraints as bitsets
+            variable_choice_strategy (VariableChoiceStrategy): Strategy used to
+                choose the next variable
+            value_choice_strategy (ValueChoiceStrategy): Strategy used to
+                choose the next value
+
+        Returns:
+            Optional[MutableMapping[Variable, int]]: A complete assignment,
+                giving the index of the value of each variable, None if there
+                is none
+        """
+        assignment: MutableMapping[Variable, int] = {}
+        if not domains:
+            return assignment
+        kernels: MutableMapping[Variable, Kernel] = {}
+        stack = [
+            self.__frame(
+                assignment,
+                domains,
+                supports,
+                kernels,
+                variable_choice_strategy,
+                value_choice_strategy,
+            )
+        ]
+        while stack:
+            variable, indices, frame_domains = stack[-1]
+            assignment.pop(variable, None)
+            for index in indices:
+                new_domains = kernels[variable](index, assignment, frame_domains)
+                if new_domains is not None:
+                    break
+            else:
+                stack.pop()
+                continue
+            assignment[variable] = index
+            if len(assignment) == len(domains):
+                return assignment
+            stack.append(
+                self.__frame(
+                    assignment,
+                    new_domains,
+                    supports,
+                    kernels,
+                    variable_choice_strategy,
+                    value_choice_strategy,
+                )
+            )
+        return None
+
     def backtrack(
         self,
-        variable_choice_strategy: Literal[
-            "lexicographic",
-            "random",
-            "domain",
-            "constraint",
-            "dynamic-constraint",
-            "bound",
-            "impact",
-        ] = "lexicographic",
-        value_choice_strategy: Literal[
-            "random", "support", "less-filtering"
-        ] = "random",
-    ):
-        """Backtrack algorithm
+        variable_choice_strategy: VariableChoiceStrategy = "domain",
+        value_choice_strategy: ValueChoiceStrategy = "less-filtering",
+    ) -> Optional[Mapping[Variable, int]]:
+        """Backtrack algorithm with forward checking
+
+        The domains and the constraints of the CSP are restored once the
+        search is over.
 
         Args:
             variable_choice_strategy (Literal[
@@ -380,12 +1192,33 @@ class CSP:
                 "random",
                 "domain",
                 "constraint",
-                "dynamic-constraint",
-                "bound",
-                "impact"): Strategy used to choose the next variable. Defaults to "lexicographic".
+                "dynamic-constraint"): Strategy used to choose the next variable. Defaults to "domain".
             value_choice_strategy (Literal[
                 "random",
                 "support",
-                "less-filtering"): Strategy used to choose the next value. Defaults to "random".
+                "less-filtering"): Strategy used to choose the next value. Defaults to "less-filtering".
+
+        Returns:
+            Optional[Mapping[Variable, int]]: Values of the primary variables
+                in a solution, None if the CSP has no solution
         """
-        pass
+        domains = dict(self.domains)
+        valid_tuples = [constraint.valid_tuples for constraint in self.constraints]
+        try:
+            if not self.ac3():
+                return None
+            values = {v: list(domain) for v, domain in self.domains.items()}
+            assignment = self.__backtrack_fc(
+                {v: (1 << len(values[v])) - 1 for v in values},
+                self.__bit_supports(values),
+                variable_choice_strategy,
+                value_choice_strategy,
+            )
+        finally:
+            self.domains.update(domains)
+            for constraint, tuples in zip(self.constraints, valid_tuples):
+                if constraint.valid_tuples is not tuples:
+                    constraint.valid_tuples = tuples
+        if assignment is None:
+            return None
+        return {v: cast(int, values[v][assignment[v]]) for v in self.primary_variables}
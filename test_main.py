@@ -0,0 +1,416 @@
+"""test_main.py"""
+
+import importlib
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from itertools import combinations, product
+from pathlib import Path
+from unittest import mock
+
+import main
+from main import CSP
+
+
+def is_queens_solution(solution, n):
+    values = [solution["q" + str(i)] for i in range(n)]
+    return all(
+        values[i] != values[j] and abs(values[i] - values[j]) != j - i
+        for i, j in combinations(range(n), 2)
+    )
+
+
+d = 1
+
+
+def diag(a, b):
+    return abs(a - b) != d
+
+
+class TestConstraintIndex(unittest.TestCase):
+    def test_constraints_concerning_variable_returns_a_copy(self):
+        csp = CSP()
+        csp.add_variables("abc", range(3))
+        csp.add_constraint(("a", "b"), lambda x, y: x != y)
+        csp.add_constraint(("b", "c"), lambda x, y: x < y)
+        constraints = csp.constraints_concerning_variable("b")
+        self.assertEqual([c.variables for c in constraints], [("a", "b"), ("b", "c")])
+        constraints.clear()
+        self.assertEqual(len(csp.constraints_concerning_variable("b")), 2)
+
+    def test_unknown_variable_is_not_indexed(self):
+        csp = CSP()
+        csp.add_variables("ab", range(3))
+        csp.add_constraint(("a", "b"), lambda x, y: x != y)
+        self.assertEqual(csp.constraints_concerning_variable("z"), [])
+        self.assertNotIn("z", csp.variable_constraints)
+
+
+class TestPredicateCache(unittest.TestCase):
+    def test_lambdas_reading_loop_globals_are_not_shared(self):
+        global i, j
+        csp = CSP()
+        csp.add_variables(["q" + str(k) for k in range(6)], range(6))
+        for i, j in combinations(range(6), 2):
+            csp.add_constraint(
+                ("q" + str(i), "q" + str(j)), lambda a, b: abs(a - b) != j - i
+            )
+        self.assertEqual(len(csp.predicate_cache), 15)
+        q0_q2 = csp.constraints_concerning_variable("q2")[0]
+        self.assertEqual(q0_q2.variables, ("q0", "q2"))
+        self.assertIn((0, 1), q0_q2.valid_tuples)
+        self.assertNotIn((0, 2), q0_q2.valid_tuples)
+        csp.all_diff()
+        solution = csp.backtrack("domain")
+        self.assertIsNotNone(solution)
+        self.assertTrue(is_queens_solution(solution, 6))
+
+    def test_named_function_reading_a_global_is_not_shared(self):
+        global d
+        csp = CSP()
+        csp.add_variables(["q" + str(k) for k in range(6)], range(6))
+        for i, j in combinations(range(6), 2):
+            d = j - i
+            csp.add_constraint(("q" + str(i), "q" + str(j)), diag)
+        q0_q2 = csp.constraints_concerning_variable("q2")[0]
+        self.assertEqual(q0_q2.variables, ("q0", "q2"))
+        self.assertNotIn((0, 2), q0_q2.valid_tuples)
+        self.assertIn((0, 1), q0_q2.valid_tuples)
+        csp.all_diff()
+        solution = csp.backtrack()
+        self.assertIsNotNone(solution)
+        self.assertTrue(is_queens_solution(solution, 6))
+
+    def test_same_function_on_same_domains_is_shared(self):
+        csp = CSP()
+        csp.add_variables("abc", range(4))
+
+        def less(a, b):
+            return a < b
+
+        csp.add_constraint(("a", "b"), less)
+        csp.add_constraint(("b", "c"), less)
+        self.assertEqual(len(csp.predicate_cache), 1)
+        self.assertIs(csp.constraints[0].valid_tuples, csp.constraints[1].valid_tuples)
+
+
+class TestClosedForms(unittest.TestCase):
+    DOMAINS = (
+        ({0, 1, 2, 3}, {0, 1, 2, 3}),
+        ({1, 3, 4, 7}, {0, 3, 4, 9}),
+        ({-2, 5}, {0, 1}),
+        (set(), {1, 2}),
+    )
+
+    def test_closed_forms_match_enumeration(self):
+        for predicate, closed_form in main.CLOSED_FORMS.items():
+            for domain_1, domain_2 in self.DOMAINS:
+                with self.subTest(predicate=predicate, domains=(domain_1, domain_2)):
+                    self.assertEqual(
+                        closed_form(domain_1, domain_2),
+                        {t for t in product(domain_1, domain_2) if predicate(*t)},
+                    )
+
+    def test_closed_forms_are_used_by_add_constraint(self):
+        for predicate in main.CLOSED_FORMS:
+            with self.subTest(predicate=predicate):
+                csp = CSP()
+                csp.add_variable("a", [1, 3, 4, 7])
+                csp.add_variable("b", [0, 3, 4, 9])
+                csp.add_constraint(("a", "b"), predicate)
+                self.assertEqual(
+                    csp.constraints[0].valid_tuples,
+                    {
+                        t
+                        for t in product([1, 3, 4, 7], [0, 3, 4, 9])
+                        if predicate(*t)
+                    },
+                )
+
+
+class TestSymmetric(unittest.TestCase):
+    def valid_tuples(self, domains, function, symmetric):
+        csp = CSP()
+        names = ["v" + str(k) for k in range(len(domains))]
+        for name, domain in zip(names, domains):
+            csp.add_variable(name, domain)
+        csp.add_constraint(tuple(names), function, symmetric=symmetric)
+        if len(domains) == 2:
+            return set(csp.constraints[0].valid_tuples)
+        return set(csp.domains["X1"])
+
+    def test_symmetric_valid_tuples_match_enumeration(self):
+        for size in (1, 2, 3):
+            with self.subTest(size=size):
+                self.assertEqual(
+                    main.symmetric_valid_tuples(
+                        {0, 1, 2, 3}, size, lambda *t: sum(t) % 3 == 0
+                    ),
+                    {t for t in product(range(4), repeat=size) if sum(t) % 3 == 0},
+                )
+
+    def test_symmetric_constraints_match_enumeration(self):
+        cases = (
+            ([range(5), range(5)], lambda a, b: abs(a - b) > 1),
+            ([range(4)] * 3, lambda a, b, c: a + b + c == 5),
+        )
+        for domains, function in cases:
+            with self.subTest(size=len(domains)):
+                expected = {t for t in product(*domains) if function(*t)}
+                self.assertEqual(self.valid_tuples(domains, function, True), expected)
+
+    def test_unequal_domains_fall_back_to_enumeration(self):
+        cases = (
+            ([range(3), range(1, 5)], lambda a, b: a < b),
+            ([range(3), range(3), range(1, 4)], lambda a, b, c: a + b < c),
+        )
+        for domains, function in cases:
+            with self.subTest(size=len(domains)):
+                expected = {t for t in product(*domains) if function(*t)}
+                self.assertEqual(self.valid_tuples(domains, function, True), expected)
+                self.assertEqual(self.valid_tuples(domains, function, False), expected)
+
+
+class TestWeightedSum(unittest.TestCase):
+    def test_valid_tuples_match_enumeration(self):
+        for operator, compare in (
+            ("<", lambda s: s < 7),
+            ("=", lambda s: s == 7),
+            (">", lambda s: s > 7),
+        ):
+            with self.subTest(operator=operator):
+                csp = CSP()
+                csp.add_variables("abc", range(4))
+                csp.weighted_sum("abc", [1, 2, 3], operator, 7)
+                expected = {
+                    t
+                    for t in product(range(4), repeat=3)
+                    if compare(t[0] + 2 * t[1] + 3 * t[2])
+                }
+                self.assertEqual(csp.domains["X1"], expected)
+
+    def test_no_variables(self):
+        csp = CSP()
+        csp.weighted_sum([], [], "=", 0)
+        self.assertEqual(csp.domains["X1"], {()})
+        csp = CSP()
+        csp.weighted_sum()
+        self.assertEqual(csp.domains["X1"], set())
+
+
+class TestAC3(unittest.TestCase):
+    def test_prunes_unsupported_values(self):
+        csp = CSP()
+        csp.add_variables("abc", range(5))
+        csp.add_constraint(("a", "b"), lambda x, y: x < y)
+        csp.add_constraint(("b", "c"), lambda x, y: x < y)
+        csp.weighted_sum("abc", [1, 1, 1], "=", 3)
+        self.assertTrue(csp.ac3())
+        self.assertEqual([csp.domains[v] for v in "abc"], [{0}, {1}, {2}])
+        self.assertEqual(csp.domains["X1"], {(0, 1, 2)})
+
+    def test_keeps_constraints_without_pruned_variables(self):
+        csp = CSP()
+        csp.add_variables("abcd", range(3))
+        csp.add_constraint(("a", "b"), lambda x, y: x < y)
+        csp.add_constraint(("c", "d"), lambda x, y: x != y)
+        untouched = csp.constraints[1].valid_tuples
+        self.assertTrue(csp.ac3())
+        self.assertEqual(csp.domains["a"], {0, 1})
+        self.assertIs(csp.constraints[1].valid_tuples, untouched)
+
+
+class TestBacktrack(unittest.TestCase):
+    def queens(self, n):
+        csp = CSP()
+        names = ["q" + str(k) for k in range(n)]
+        csp.add_variables(names, range(n))
+        csp.all_diff()
+        for k, l in combinations(range(n), 2):
+            csp.add_constraint(
+                (names[k], names[l]), lambda a, b, d=l - k: abs(a - b) != d
+            )
+        return csp
+
+    def test_default_strategies_solve_queens(self):
+        solution = self.queens(8).backtrack()
+        self.assertIsNotNone(solution)
+        self.assertTrue(is_queens_solution(solution, 8))
+
+    def test_default_strategies_are_deterministic(self):
+        self.assertEqual(self.queens(8).backtrack(), self.queens(8).backtrack())
+
+    def test_variable_choice_helpers(self):
+        csp = CSP()
+        csp.add_variable("a", range(4))
+        csp.add_variable("b", range(2))
+        csp.add_variable("c", range(3))
+        csp.add_constraint(("a", "c"), lambda x, y: x != y)
+        self.assertEqual(csp.variable_with_minimal_domain(), "b")
+        self.assertEqual(csp.variable_with_minimal_domain(["a", "c"]), "c")
+        self.assertEqual(
+            csp.variable_with_minimal_domain(["a", "c"], {"a": 1, "c": 2}.get), "a"
+        )
+        self.assertIn(csp.variable_most_constrained(), ("a", "c"))
+        self.assertEqual(csp.variable_most_constrained(["b", "c"]), "c")
+
+    def test_every_strategy_solves_queens(self):
+        for variable_strategy in (
+            "lexicographic",
+            "random",
+            "domain",
+            "constraint",
+            "dynamic-constraint",
+        ):
+            for value_strategy in ("random", "support", "less-filtering"):
+                with self.subTest(variable=variable_strategy, value=value_strategy):
+                    solution = self.queens(6).backtrack(
+                        variable_strategy, value_strategy
+                    )
+                    self.assertTrue(is_queens_solution(solution, 6))
+
+    def test_search_depth_is_not_bounded_by_recursion_limit(self):
+        csp = CSP()
+        csp.add_variables(["x" + str(k) for k in range(1200)], range(2))
+        solution = csp.backtrack()
+        self.assertEqual(len(solution), 1200)
+
+    def test_model_is_unchanged_by_a_solve(self):
+        csp = CSP()
+        csp.add_variables("ab", range(3))
+        csp.add_constraint(("a", "b"), [(0, 1), (1, 2)])
+        self.assertIsNotNone(csp.backtrack())
+        self.assertEqual(csp.domains, {"a": {0, 1, 2}, "b": {0, 1, 2}})
+        self.assertEqual(csp.constraints[0].valid_tuples, {(0, 1), (1, 2)})
+        csp.add_constraint(("a", "b"), [(2, 0)])
+        self.assertIsNone(csp.backtrack())
+
+    def test_model_is_unchanged_by_an_unsatisfiable_run(self):
+        csp = CSP()
+        csp.add_variables("ab", range(2))
+        csp.add_constraint(("a", "b"), lambda x, y: x > y + 1)
+        self.assertIsNone(csp.backtrack())
+        self.assertEqual(csp.domains, {"a": {0, 1}, "b": {0, 1}})
+
+    def test_unsatisfiable(self):
+        self.assertIsNone(self.queens(3).backtrack())
+
+
+k = 0
+
+
+class Holder:
+    k = 3
+
+
+HOLDER = Holder()
+
+
+def holder_sum(a, b, c):
+    return a + b + c == HOLDER.k
+
+
+class Gap:
+    def __init__(self, total):
+        self.total = total
+
+    def ok(self, a, b, c):
+        return a + b + c == self.total
+
+
+class TestFunctionSignature(unittest.TestCase):
+    def test_attribute_names_are_not_globals(self):
+        global k
+        signature = main.function_signature(holder_sum)
+        self.assertIsNotNone(signature)
+        k = 1
+        try:
+            self.assertEqual(main.function_signature(holder_sum), signature)
+        finally:
+            k = 0
+
+    def test_bound_methods_have_no_signature(self):
+        self.assertIsNone(main.function_signature(Gap(3).ok))
+
+    def test_bound_methods_of_two_instances_are_not_shared(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for total, expected in ((3, 10), (5, 12)):
+                csp = CSP(cache_dir=cache_dir)
+                csp.add_variables("abc", range(4))
+                csp.add_constraint(("a", "b", "c"), Gap(total).ok)
+                self.assertEqual(len(csp.domains["X1"]), expected)
+
+
+HELPER = """def ok(a, b, c):
+    return a + b + c == {}
+"""
+
+MODEL = """from csp_test_helper import ok
+
+
+def build(csp):
+    csp.add_constraint(("a", "b", "c"), lambda a, b, c: ok(a, b, c))
+"""
+
+
+class TestPersistentCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.root = Path(self.directory.name)
+        self.cache_dir = self.root / "cache"
+        sys.path.insert(0, str(self.root))
+        self.addCleanup(sys.path.remove, str(self.root))
+        for name in ("csp_test_helper", "csp_test_model"):
+            self.addCleanup(sys.modules.pop, name, None)
+
+    def write_module(self, name, source, mtime):
+        path = self.root / (name + ".py")
+        path.write_text(source)
+        os.utime(path, (mtime, mtime))
+
+    def build(self):
+        for name in ("csp_test_helper", "csp_test_model"):
+            sys.modules.pop(name, None)
+        importlib.invalidate_caches()
+        model = importlib.import_module("csp_test_model")
+        csp = CSP(cache_dir=self.cache_dir)
+        csp.add_variables("abc", range(4))
+        model.build(csp)
+        return csp
+
+    def test_results_are_reused_across_instances(self):
+        self.write_module("csp_test_helper", HELPER.format(3), 1000)
+        self.write_module("csp_test_model", MODEL, 1000)
+        self.assertEqual(len(self.build().domains["X1"]), 10)
+        with mock.patch("main.pickle.load", wraps=main.pickle.load) as load:
+            self.assertEqual(len(self.build().domains["X1"]), 10)
+        load.assert_called_once()
+        self.assertEqual([p.suffix for p in self.cache_dir.iterdir()], [".pickle"])
+
+    def test_editing_a_referenced_function_invalidates_results(self):
+        self.write_module("csp_test_helper", HELPER.format(3), 1000)
+        self.write_module("csp_test_model", MODEL, 1000)
+        self.assertEqual(len(self.build().domains["X1"]), 10)
+        self.write_module("csp_test_helper", HELPER.format(5), 2000)
+        self.assertEqual(len(self.build().domains["X1"]), 12)
+
+    def test_failed_write_leaves_no_temporary_file(self):
+        self.write_module("csp_test_helper", HELPER.format(3), 1000)
+        self.write_module("csp_test_model", MODEL, 1000)
+        with mock.patch("main.os.replace", side_effect=OSError):
+            self.assertEqual(len(self.build().domains["X1"]), 10)
+        self.assertEqual(list(self.cache_dir.iterdir()), [])
+
+    def test_import_does_not_require_a_home_directory(self):
+        spec = importlib.util.spec_from_file_location("csp_main_copy", main.__file__)
+        module = importlib.util.module_from_spec(spec)
+        with mock.patch("pathlib.Path.home", side_effect=RuntimeError):
+            spec.loader.exec_module(module)
+        module.CSP().add_variable("a", range(2))
+
+
+if __name__ == "__main__":
+    unittest.main()